@@ -3,15 +3,18 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
-import random
+import itertools
 from scrapy import signals
 
 
-USER_AGENTS = [
-    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/120.0.0.0 Safari/537.36",
-    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 Safari/605.1.15",
-    "Mozilla/5.0 (X11; Ubuntu; Linux x86_64) AppleWebKit/537.36 Chrome/120.0.0.0 Safari/537.36",
-]
+# Déjà encodés en bytes pour éviter l'encodage à chaque requête
+USER_AGENTS = (
+    b"Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/120.0.0.0 Safari/537.36",
+    b"Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 Safari/605.1.15",
+    b"Mozilla/5.0 (X11; Ubuntu; Linux x86_64) AppleWebKit/537.36 Chrome/120.0.0.0 Safari/537.36",
+)
+# Rotation circulaire des User-Agents (répartition uniforme, sans tirage aléatoire)
+_UA_NEXT = itertools.cycle(USER_AGENTS).__next__
 # useful for handling different item types with a single interface
 
 
@@ -79,7 +82,7 @@ class MonprojetDownloaderMiddleware:
         #spider.logger.debug(f"Processing request for spider: {spider.name}")
         
         # Modifier le User-Agent pour toutes les requêtes
-        request.headers['User-Agent'] = random.choice(USER_AGENTS)
+        request.headers['User-Agent'] = _UA_NEXT()
     
         # Must either:
         # - return None: continue processing this request
@@ -1,44 +1,89 @@
 import os
+import queue
 import sqlite3
-from datetime import datetime
-from dotenv import load_dotenv
-import scrapy
+import threading
+import time
 from scrapy.exceptions import DropItem
 import logging
 
 # Configuration du logger
 logger = logging.getLogger(__name__)
 
-# Chargement des variables d'environnement
-load_dotenv()
+# Requête d'insertion/mise à jour des livres, partagée par tous les lots.
+# created_at est horodaté par SQLite à l'insertion (même format que les lignes existantes).
+# Le WHERE évite de réécrire les lignes inchangées lors d'un nouveau crawl.
+_UPSERT_SQL = '''
+    INSERT INTO books
+    (title, price, rating, category, stock, url, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, strftime('%Y-%m-%dT%H:%M:%S', 'now'))
+    ON CONFLICT(url) DO UPDATE SET
+        title=excluded.title,
+        price=excluded.price,
+        rating=excluded.rating,
+        category=excluded.category,
+        stock=excluded.stock
+    WHERE books.title IS NOT excluded.title
+        OR books.price IS NOT excluded.price
+        OR books.rating IS NOT excluded.rating
+        OR books.category IS NOT excluded.category
+        OR books.stock IS NOT excluded.stock
+'''
+
+# Marqueur de fin pour le thread d'écriture SQLite
+_STOP = object()
 
 class CleanPipeline:
-    """Pipeline de nettoyage des données"""
+    """Pipeline de nettoyage et de validation des données"""
     
     def process_item(self, item, spider):
-        # Nettoyage et validation des champs
-        for field in item.fields:
-            if field in item and item[field] is not None:
-                if isinstance(item[field], str):
-                    item[field] = item[field].strip()
+        # Nettoyage des seuls champs texte (prix et note sont convertis dans ScrapybooksSpider.parse, le stock dans parse_book_detail)
+        item_get = item.get
+
+        title = item_get('title')
+        if isinstance(title, str):
+            item['title'] = title.strip()
+
+        category = item_get('category')
+        if isinstance(category, str):
+            item['category'] = category.strip()
+
+        url = item_get('url')
+        if isinstance(url, str):
+            item['url'] = url.strip()
+
+        # Seule validation des champs obligatoires : les pipelines suivants s'y fient
+        if not (item_get('title') and item_get('url')):
+            raise DropItem("Champs obligatoires manquants dans l'item")
+
         return item
 
 
 class DuplicatesLoggerPipeline:
     """Pipeline pour détecter et logger les doublons"""
     
-    def __init__(self):
+    def __init__(self, max_tracked=1000000):
+        # Empreintes 64 bits des URL (hash()) plutôt que les chaînes complètes :
+        # moins de mémoire, et le risque de collision (~2^-64) est négligeable
         self.seen_urls = set()
+        # Au-delà de cette taille, les nouvelles URL ne sont plus mémorisées :
+        # la contrainte UNIQUE(url) de SQLite prend le relais pour les doublons
+        self.max_tracked = max_tracked
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(max_tracked=crawler.settings.getint('DUPLICATES_MAX_TRACKED', 1000000))
 
     def process_item(self, item, spider):
-        if not item.get('url'):
-            raise DropItem("URL manquante dans l'item")
-            
-        if item['url'] in self.seen_urls:
-            spider.logger.warning(f"Doublon ignoré: {item.get('title', 'Sans titre')} - {item['url']}")
-            raise DropItem(f"Doublon ignoré: {item.get('title', 'Sans titre')}")
+        # URL garantie non vide par CleanPipeline
+        url = item['url']
+        url_hash = hash(url)
+        if url_hash in self.seen_urls:
+            if spider.logger.isEnabledFor(logging.DEBUG):
+                spider.logger.debug("Doublon ignoré: %s - %s", item.get('title', 'Sans titre'), url)
+            raise DropItem("Doublon ignoré")
             
-        self.seen_urls.add(item['url'])
+        if len(self.seen_urls) < self.max_tracked:
+            self.seen_urls.add(url_hash)
         return item
 
 
@@ -48,8 +93,12 @@ class SQLitePipeline:
     def __init__(self):
         self.conn = None
         self.cur = None
-        self.batch_size = 100  # Taille du lot pour les insertions par lots
-        self.batch_count = 0
+        self.batch_size = 1000  # Taille du lot pour les insertions par lots
+        self.pending = [None] * self.batch_size  # Tampon pré-alloué des lignes en attente
+        self.pending_count = 0  # Nombre de lignes occupées dans le tampon
+        self.queue = queue.Queue(maxsize=10000)  # Lignes transmises au thread d'écriture (bornée)
+        self.flush_interval = 1.0  # Âge maximal (s) d'un lot incomplet avant son écriture
+        self.writer = None
 
     def open_spider(self, spider):
         """Initialise la connexion à la base de données"""
@@ -61,9 +110,26 @@ class SQLitePipeline:
             if not os.path.exists(db_path):
                 raise sqlite3.Error(f"Le fichier de base de données n'existe pas: {db_path}")
                 
-            self.conn = sqlite3.connect(db_path)
+            # isolation_level=None : les transactions sont gérées explicitement (BEGIN/COMMIT par lot)
+            # check_same_thread=False : la connexion est ensuite utilisée uniquement par le thread d'écriture
+            self.conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
             self.conn.row_factory = sqlite3.Row
             self.cur = self.conn.cursor()
+            self._executemany = self.cur.executemany
+
+            # WAL + synchronous=NORMAL : pas de fsync complet à chaque commit.
+            # Un crash système peut faire perdre les derniers lots validés, mais la base reste cohérente
+            # (les données se retrouvent au prochain crawl).
+            journal_mode = self.cur.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+            if journal_mode.lower() != 'wal':
+                spider.logger.warning("Mode WAL non activé sur SQLite (journal_mode=%s)", journal_mode)
+            self.cur.execute("PRAGMA synchronous=NORMAL")
+            self.cur.execute("PRAGMA temp_store=MEMORY")
+            self.cur.execute("PRAGMA cache_size=-65536")  # 64 Mo de cache
+            self.cur.execute("PRAGMA mmap_size=268435456")  # 256 Mo de mémoire mappée
+            # Borne la taille du fichier WAL pendant les longs crawls
+            self.cur.execute("PRAGMA wal_autocheckpoint=10000")
+            self.cur.execute("PRAGMA journal_size_limit=67108864")  # 64 Mo
             
             # Vérifier si la table existe
             self.cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='books'")
@@ -71,6 +137,12 @@ class SQLitePipeline:
                 raise sqlite3.Error("La table 'books' n'existe pas dans la base de données")
                 
             spider.logger.info(f"Connexion à la base de données SQLite établie: {db_path}")
+
+            # Les écritures SQLite se font hors du thread du reactor Twisted
+            self.writer = threading.Thread(
+                target=self._write_loop, args=(spider,), name="sqlite-writer", daemon=True
+            )
+            self.writer.start()
             
         except sqlite3.Error as e:
             spider.logger.error(f"Erreur de connexion à SQLite: {e}")
@@ -81,53 +153,125 @@ class SQLitePipeline:
         pass
 
     def process_item(self, item, spider):
-        """Traite et enregistre un item dans la base de données"""
-        if not all(item.get(field) for field in ['title', 'url']):
-            raise DropItem("Champs obligatoires manquants dans l'item")
+        """Transmet l'item au thread d'écriture.
+
+        La file est bornée : si l'écriture prend du retard et que la file est pleine,
+        put() bloque le reactor jusqu'à ce qu'une place se libère, ce qui freine le crawl.
+        """
+        # Sans thread d'écriture, la file finirait par se remplir et bloquer le crawl
+        if not self.writer.is_alive():
+            raise DropItem("Thread d'écriture SQLite arrêté")
+        item_get = item.get
+        self.queue.put((
+            item_get('title'),
+            item_get('price'),
+            item_get('rating'),
+            item_get('category'),
+            item_get('stock', -1),
+            item['url']
+        ))
+        return item
 
+    def _write_loop(self, spider):
+        """Boucle du thread d'écriture : regroupe les lignes en lots"""
+        queue_get = self.queue.get
+        monotonic = time.monotonic
+        deadline = None
+        while True:
+            # Échéance comptée depuis la première ligne du lot, et non depuis la dernière reçue :
+            # un flux lent d'items est quand même regroupé, un flux rapide est écrit à temps
+            timeout = None
+            if self.pending_count:
+                timeout = deadline - monotonic()
+                if timeout <= 0:
+                    self._flush(spider)
+                    continue
+            try:
+                row = queue_get(timeout=timeout)
+            except queue.Empty:
+                # Lot partiel trop ancien : on l'écrit pour que l'API le voie sans attendre
+                self._flush(spider)
+                continue
+            if row is _STOP:
+                break
+            if not self.pending_count:
+                deadline = monotonic() + self.flush_interval
+            self.pending[self.pending_count] = row
+            self.pending_count += 1
+
+            # Écriture par lots : une seule transaction pour batch_size items
+            if self.pending_count >= self.batch_size:
+                self._flush(spider)
+
+        self._flush(spider)
+
+    def _flush(self, spider):
+        """Insère le lot en attente dans une seule transaction"""
+        count = self.pending_count
+        if not count:
+            return
+
+        # Lot complet : le tampon est passé tel quel, sinon seulement la partie remplie
+        rows = self.pending if count == self.batch_size else self.pending[:count]
         try:
-            self.cur.execute('''
-                INSERT INTO books 
-                (title, price, rating, category, stock, url, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT(url) DO UPDATE SET
-                    title=excluded.title,
-                    price=excluded.price,
-                    rating=excluded.rating,
-                    category=excluded.category,
-                    stock=excluded.stock,
-                    updated_at=CURRENT_TIMESTAMP
-            ''', (
-                item.get('title'),
-                item.get('price'),
-                item.get('rating'),
-                item.get('category'),
-                item.get('stock', -1),
-                item['url']
-            ))
-            
-            self.batch_count += 1
-            
-            # Validation périodique pour éviter les verrous trop longs
-            if self.batch_count >= self.batch_size:
-                self.conn.commit()
-                self.batch_count = 0
-                
-            return item
-            
+            self.cur.execute("BEGIN")
+            self._executemany(_UPSERT_SQL, rows)
+            self.cur.execute("COMMIT")
+        except Exception as e:
+            # Toute erreur est journalisée ici : elle ne doit pas arrêter le thread d'écriture.
+            # Une seule ligne invalide annule tout le lot : on réessaie ligne par ligne
+            # pour ne perdre que les items fautifs.
+            spider.logger.warning("Erreur lors de l'insertion d'un lot de %d items, nouvel essai ligne par ligne: %s", count, e)
+            self._rollback(spider)
+            self._write_rows(spider, rows)
+        finally:
+            self.pending_count = 0
+
+    def _write_rows(self, spider, rows):
+        """Insère les lignes une par une dans une transaction, en écartant celles qui échouent"""
+        execute = self.cur.execute
+        try:
+            execute("BEGIN")
+            for row in rows:
+                try:
+                    execute(_UPSERT_SQL, row)
+                except Exception as e:
+                    spider.logger.error("Item non enregistré dans SQLite (%s): %s", row[5], e)
+            execute("COMMIT")
+        except Exception as e:
+            spider.logger.error("Erreur lors de l'insertion ligne par ligne de %d items: %s", len(rows), e)
+            self._rollback(spider)
+
+    def _rollback(self, spider):
+        """Annule la transaction en cours, sans laisser l'erreur remonter"""
+        try:
+            if self.conn.in_transaction:
+                self.cur.execute("ROLLBACK")
         except sqlite3.Error as e:
-            self.conn.rollback()
-            spider.logger.error(f"Erreur SQLite lors de l'insertion: {e}")
-            raise DropItem(f"Erreur de base de données: {e}")
+            spider.logger.error("Erreur SQLite lors de l'annulation du lot: %s", e)
 
     def close_spider(self, spider):
-        """Ferme la connexion à la base de données"""
+        """Écrit le dernier lot puis ferme la connexion à la base de données"""
+        if self.writer:
+            # Vide la file et écrit le dernier lot avant de fermer
+            if self.writer.is_alive():
+                self.queue.put(_STOP)
+            self.writer.join()
+            self.writer = None
+        if not self.conn:
+            return
+        try:
+            if self.cur:
+                # Statistiques à jour pour le planificateur, puis WAL tronqué après le chargement
+                self.cur.execute("ANALYZE books")
+                self.cur.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except sqlite3.Error as e:
+            # Maintenance facultative : la connexion est fermée quoi qu'il arrive
+            spider.logger.warning("Maintenance SQLite ignorée à la fermeture: %s", e)
         try:
-            if self.conn:
-                self.conn.commit()  # S'assure que tout est commité
-                if self.cur:
-                    self.cur.close()
-                self.conn.close()
-                spider.logger.info("Connexion à la base de données fermée")
+            if self.cur:
+                self.cur.close()
+            self.conn.close()
+            spider.logger.info("Connexion à la base de données fermée")
         except sqlite3.Error as e:
             spider.logger.error(f"Erreur lors de la fermeture de la connexion: {e}")
@@ -1,7 +1,12 @@
+import logging
+import re
+
 import scrapy
 from ..items import BookItem
-from ..itemloaders import BookLoader
-import re
+from ..itemloaders import clean_price, clean_rating
+
+# Quantité en stock : "In stock (22 available)" -> "22"
+_STOCK_RE = re.compile(r"\((\d+)\s+available\)")
 
 class ScrapybooksSpider(scrapy.Spider):
     name = "scrapybooks"
@@ -9,28 +14,29 @@ class ScrapybooksSpider(scrapy.Spider):
     start_urls = ["http://books.toscrape.com/catalogue/page-1.html"]
 
     def parse(self, response):
-        for bloc in response.css('article.product_pod'):
-            # On crée un loader en liant l'item, le bloc et la réponse
-            loader = BookLoader(item=BookItem(), selector=bloc, response=response)
-
-            # Extraction des champs de base
-            loader.add_css('title', 'h3 a::attr(title)')
-            loader.add_css('price', 'p.price_color::text')
-            loader.add_css('rating', 'p.star-rating::attr(class)')
-            
-            # On récupère l'URL du livre
-            book_url = response.urljoin(bloc.css('h3 a::attr(href)').get())
-            loader.add_value('url', book_url)
+        sel = response.selector  # Sélecteur de la page construit une seule fois
+        for bloc in sel.css('article.product_pod'):
+            # Le lien du titre porte à la fois l'URL et le titre complet : une seule requête CSS
+            link = bloc.css('h3 a').attrib
+            book_url = response.urljoin(link.get('href'))
+
+            # Extraction des champs de base, nettoyés directement (pas de loader à garder en mémoire)
+            item = BookItem(
+                title=(link.get('title') or '').strip(),
+                price=clean_price(bloc.css('p.price_color::text').get()),
+                rating=clean_rating(bloc.css('p.star-rating::attr(class)').get()),
+                url=book_url,
+            )
             
             # On suit le lien vers la page détaillée pour récupérer le stock et la catégorie
             yield scrapy.Request(
                 book_url,
                 callback=self.parse_book_detail,
-                meta={'loader': loader}
+                meta={'item': item}
             )
 
         # Pagination
-        next_page = response.css('li.next a::attr(href)').get()   # Récupère le lien de la page suivante
+        next_page = sel.css('li.next a::attr(href)').get()   # Récupère le lien de la page suivante
         if next_page:
             yield response.follow(next_page, callback=self.parse)   
 
@@ -38,24 +44,28 @@ class ScrapybooksSpider(scrapy.Spider):
         
 
     def parse_book_detail(self, response):
-        loader = response.meta['loader']
+        item = response.meta['item']
+        sel = response.selector
+        debug = self.logger.isEnabledFor(logging.DEBUG)  # Logs de debug construits uniquement si actifs
 
-        # Extraction du stock depuis la page détaillée (nettoyé)
-        stock_text = response.css('p.instock.availability::text').getall()   # Récupère tout le texte dans le paragraphe
-        stock_text = " ".join(s.strip() for s in stock_text if s.strip())    # Nettoie et joint les parties
-        self.logger.debug(f"Texte du stock nettoyé: {stock_text}")           # Log pour vérifier
+        # Extraction du stock depuis la page détaillée : normalize-space assemble et
+        # nettoie le texte du paragraphe directement dans libxml2 (pas de liste Python)
+        stock_text = sel.xpath('normalize-space(//p[contains(@class, "instock")])').get() or ""
+        if debug:
+            self.logger.debug("Texte du stock: %s", stock_text)           # Log pour vérifier
 
-        # Extraction du nombre avec regex
-        stock_match = re.search(r'\((\d+)\s+available\)', stock_text) # Cherche un nombre suivi de " available"
-        stock_qty = int(stock_match.group(1)) if stock_match else 0   # Si pas trouvé, on met 0
-        self.logger.debug(f"Quantité extraite: {stock_qty}")          
+        # Extraction du nombre entre parenthèses
+        match = _STOCK_RE.search(stock_text)
+        stock_qty = int(match.group(1)) if match else 0   # Si pas trouvé, on met 0
+        if debug:
+            self.logger.debug("Quantité extraite: %s", stock_qty)
 
         # Ajout du stock à l'item
-        loader.add_value('stock', stock_qty)
+        item['stock'] = stock_qty
 
         # Extraction de la catégorie depuis le breadcrumb
-        category = response.css('ul.breadcrumb li a::text').getall()
+        category = sel.css('ul.breadcrumb li a::text').getall()
         if len(category) > 2:  # Home > Books > Catégorie
-            loader.add_value('category', category[2]) # La catégorie est le 3ème élément
+            item['category'] = category[2].strip() # La catégorie est le 3ème élément
 
-        yield loader.load_item() # On retourne l'item finalisé
\ No newline at end of file
+        yield item # On retourne l'item finalisé
\ No newline at end of file
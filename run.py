@@ -1,7 +1,6 @@
 if __name__ == "__main__":
     import uvicorn
     import os
-    import multiprocessing
     from dotenv import load_dotenv
     
     # Charger les variables d'environnement
@@ -15,8 +14,8 @@ if __name__ == "__main__":
     ENV = os.getenv("ENV", "development").lower()
     IS_DEV = ENV in ["dev", "development"]
     
-    # Configuration des workers
-    WORKERS = 1 if IS_DEV else min(multiprocessing.cpu_count() * 2 + 1, 4)
+    # Configuration des workers (API_WORKERS permet de fixer la valeur en production)
+    WORKERS = 1 if IS_DEV else int(os.getenv("API_WORKERS", min((os.cpu_count() or 1) * 2 + 1, 4)))
     
     # Configuration du logging
     LOG_LEVEL = "debug" if IS_DEV else "info"
@@ -35,7 +34,7 @@ if __name__ == "__main__":
     print("\nAppuyez sur Ctrl+C pour arrêter le serveur\n")
     
     # Configuration Uvicorn
-    config = uvicorn.Config(
+    config_kwargs = dict(
         app="books_api.presentation.main:app",
         host=HOST,
         port=PORT,
@@ -46,14 +45,9 @@ if __name__ == "__main__":
         limit_concurrency=1000,  # Augmenter la limite de connexions simultanées
         backlog=4096,  # Augmenter la file d'attente des connexions
         timeout_keep_alive=30,  # Timeout de 30 secondes pour les connexions inactives
-        http="auto",  # Choisir automatiquement entre httptools et h11
-        loop="auto",  # Choisir automatiquement la boucle d'événements
+        http="auto",  # httptools s'il est installé, sinon h11
+        loop="auto",  # uvloop s'il est installé, sinon asyncio
         ws="auto",  # Choisir automatiquement l'implémentation WebSocket
-        reload=IS_DEV,  # Rechargement automatique uniquement en développement
-        reload_dirs=["books_api"] if IS_DEV else None,  # Dossiers à surveiller pour le rechargement
-        reload_delay=1.0,  # Délai avant rechargement après détection de changement
-        reload_includes=["*.py"],  # Fichiers à surveiller pour le rechargement
-        reload_excludes=["*.pyc"],  # Fichiers à ignorer pour le rechargement
         # Désactiver les fonctionnalités inutiles
         proxy_headers=False,  # Désactiver le support des en-têtes de proxy
         server_header=True,  # Activer l'en-tête Server
@@ -64,6 +58,16 @@ if __name__ == "__main__":
         use_colors=True,  # Activer les couleurs dans les logs
     )
     
-    # Démarrer le serveur
-    server = uvicorn.Server(config)
-    server.run()
+    # Options de rechargement uniquement en développement : rien à configurer ni à surveiller en production
+    if IS_DEV:
+        config_kwargs.update(
+            reload=True,  # Rechargement automatique
+            reload_dirs=["books_api"],  # Dossiers à surveiller pour le rechargement
+            reload_delay=1.0,  # Délai avant rechargement après détection de changement
+            reload_includes=["*.py"],  # Fichiers à surveiller pour le rechargement
+            reload_excludes=["*.pyc"],  # Fichiers à ignorer pour le rechargement
+        )
+    
+    # Démarrer le serveur : uvicorn.run lance les workers et le rechargement,
+    # ce que uvicorn.Server(config).run() ignore
+    uvicorn.run(**config_kwargs)